@@ -1,75 +1,54 @@
 """Configuration management for Home Assistant Add-on."""
-import json
 import os
 from typing import Optional
+import fastjson
+
+# Languages with translations in translations/
+SUPPORTED_LANGUAGES = ('en', 'de', 'fr', 'es')
 
 
 class Config:
-    """Load and manage add-on configuration."""
+    """
+    Load and manage add-on configuration.
+
+    options.json does not change while the add-on runs, so every value is
+    normalized once at load time and exposed as a plain attribute.
+    """
 
     def __init__(self):
         self.config_path = "/data/options.json"
         self._config = self._load_config()
 
-    def _load_config(self) -> dict:
-        """Load configuration from Home Assistant."""
-        if os.path.exists(self.config_path):
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
-        return {}
-
-    @property
-    def grocy_url(self) -> Optional[str]:
-        """Get Grocy URL."""
-        url = self._config.get('grocy_url', '').strip()
-        return url if url else None
-
-    @property
-    def grocy_api_key(self) -> Optional[str]:
-        """Get Grocy API key."""
-        key = self._config.get('grocy_api_key', '').strip()
-        return key if key else None
+        # Grocy Integration
+        self.grocy_url: Optional[str] = self._get_str('grocy_url')
+        self.grocy_api_key: Optional[str] = self._get_str('grocy_api_key')
+        self.has_grocy: bool = self.grocy_url is not None and self.grocy_api_key is not None
 
-    @property
-    def debug(self) -> bool:
-        """Get debug mode."""
-        return self._config.get('debug', False)
+        # Debug Mode
+        self.debug: bool = self._config.get('debug', False)
 
-    @property
-    def has_grocy(self) -> bool:
-        """Check if Grocy is configured."""
-        return self.grocy_url is not None and self.grocy_api_key is not None
+        # Barcode Configuration
+        self.barcode_add: str = self._config.get('barcode_add', 'BBUDDY-ADD')
+        self.barcode_consume: str = self._config.get('barcode_consume', 'BBUDDY-CONSUME')
+        self.barcode_quantity_prefix: str = self._config.get('barcode_quantity_prefix', 'BBUDDY-Q-')
 
-    @property
-    def barcode_add(self) -> str:
-        """Get ADD mode barcode."""
-        return self._config.get('barcode_add', 'BBUDDY-ADD')
+        # Product Databases
+        self.enable_openfoodfacts: bool = self._config.get('enable_openfoodfacts', True)
+        self.enable_upcdatabase: bool = self._config.get('enable_upcdatabase', True)
 
-    @property
-    def barcode_consume(self) -> str:
-        """Get CONSUME mode barcode."""
-        return self._config.get('barcode_consume', 'BBUDDY-CONSUME')
-
-    @property
-    def barcode_quantity_prefix(self) -> str:
-        """Get quantity barcode prefix."""
-        return self._config.get('barcode_quantity_prefix', 'BBUDDY-Q-')
-
-    @property
-    def enable_openfoodfacts(self) -> bool:
-        """Check if OpenFoodFacts database is enabled."""
-        return self._config.get('enable_openfoodfacts', True)
+        # Language (falls back to English for unknown codes)
+        lang = self._config.get('language', 'en').strip()
+        self.language: str = lang if lang in SUPPORTED_LANGUAGES else 'en'
 
-    @property
-    def enable_upcdatabase(self) -> bool:
-        """Check if UPC Database is enabled."""
-        return self._config.get('enable_upcdatabase', True)
+    def _load_config(self) -> dict:
+        """Load configuration from Home Assistant."""
+        if os.path.exists(self.config_path):
+            # Read bytes; orjson parses UTF-8 directly without a text decode
+            with open(self.config_path, 'rb') as f:
+                return fastjson.loads(f.read())
+        return {}
 
-    @property
-    def language(self) -> str:
-        """Get configured language."""
-        lang = self._config.get('language', 'en').strip()
-        # Validate language code
-        if lang in ['en', 'de', 'fr', 'es']:
-            return lang
-        return 'en'  # Default fallback
+    def _get_str(self, key: str) -> Optional[str]:
+        """Get a stripped string option, None if empty."""
+        value = self._config.get(key, '').strip()
+        return value if value else None
@@ -0,0 +1,28 @@
+"""Fast JSON encoding/decoding (orjson when available, stdlib json otherwise)."""
+import json
+
+# orjson errors subclass this, so callers can catch one type for both backends
+JSONDecodeError = json.JSONDecodeError
+
+try:
+    import orjson
+except ImportError:  # No orjson wheels for armhf/i386, keep working without it
+    orjson = None
+
+
+if orjson is not None:
+    def loads(data):
+        """Parse JSON from bytes or str."""
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes."""
+        return orjson.dumps(obj)
+else:
+    def loads(data):
+        """Parse JSON from bytes or str."""
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes."""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
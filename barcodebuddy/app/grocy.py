@@ -1,10 +1,20 @@
 """Grocy API client."""
 import requests
-from typing import Optional, Dict, Any
+import threading
+import time
+from cachetools import TTLCache
+import fastjson
+from http_session import create_session
+from typing import Optional, Dict, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Request bodies for the overwhelmingly common single-item booking,
+# encoded once instead of per scan
+_ADD_ONE_BODY = fastjson.dumps({'amount': 1.0, 'transaction_type': 'purchase'})
+_CONSUME_ONE_BODY = fastjson.dumps({'amount': 1.0, 'transaction_type': 'consume'})
+
 
 class GrocyClient:
     """Client for Grocy API."""
@@ -12,20 +22,62 @@ class GrocyClient:
     def __init__(self, url: str, api_key: str):
         self.url = url.rstrip('/')
         self.api_key = api_key
+        # Every request URL is this prefix plus the endpoint
+        self._api_base = f"{self.url}/api/"
         self.headers = {
             'GROCY-API-KEY': api_key,
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         }
-        # Use a session to persist cookies/connection
-        self.session = requests.Session()
+        # Pooled keep-alive session: requests from the scan worker and the
+        # web threads reuse open connections instead of reconnecting. A read
+        # timeout is never retried, so a stalled Grocy holds a scan for one
+        # 10 s timeout, not three.
+        self.session = create_session(pool_size=8)
         self.session.headers.update(self.headers)
+        # Short-lived caches so rescanning the same item skips the lookups.
+        # Only id/name are used from these, which stock changes don't touch.
+        self._barcode_cache = TTLCache(maxsize=512, ttl=60)
+        self._product_cache = TTLCache(maxsize=512, ttl=300)
+        # Barcodes Grocy doesn't know. Kept short, since users often fix
+        # missing barcodes in the Grocy UI and rescan right away.
+        self._miss_cache = TTLCache(maxsize=2048, ttl=60)
+        # Bumped by invalidate() per barcode and by clear_cache() for all, so
+        # a lookup still in flight doesn't put a stale answer back afterwards
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self._cache_lock = threading.Lock()
+        # Default IDs for new products, fetched once on first product creation
+        self._default_location_id: Optional[int] = None
+        self._default_quantity_unit_id: Optional[int] = None
+
+    def _generation(self, barcode: str) -> Tuple[int, int]:
+        """Cache generation of a barcode (call with _cache_lock held)."""
+        return self._clears, self._generations.get(barcode, 0)
+
+    def _remember_miss(self, barcode: str, generation: Optional[Tuple[int, int]]):
+        """Cache a not-found answer, unless the barcode was invalidated while it was looked up."""
+        with self._cache_lock:
+            if generation is None or self._generation(barcode) == generation:
+                self._miss_cache[barcode] = True
 
-    def _request(self, method: str, endpoint: str, retry: bool = True, **kwargs) -> Optional[Dict[Any, Any]]:
-        """Make API request with automatic retry on redirect."""
-        import time
-        url = f"{self.url}/api/{endpoint.lstrip('/')}"
-        logger.debug(f"Grocy API call: {method} {url}")
+    def _request(self, method: str, endpoint: str, retry: bool = True,
+                 miss_key: Optional[str] = None, miss_generation: Optional[Tuple[int, int]] = None,
+                 **kwargs) -> Optional[Dict[Any, Any]]:
+        """
+        Make API request with automatic retry on redirect.
+
+        endpoint is relative to /api/ and has no leading slash.
+        If miss_key is given, a 400/404 answer (not found) is remembered in
+        the miss cache under that key, if its generation still matches
+        miss_generation (taken before the request). Transport errors are
+        never cached.
+        """
+        url = self._api_base + endpoint
+        logger.debug("Grocy API call: %s %s", method, url)
+        if 'json' in kwargs:
+            # Encode the body ourselves; Content-Type is set on the session
+            kwargs['data'] = fastjson.dumps(kwargs.pop('json'))
         try:
             # Don't follow redirects - API should respond directly
             response = self.session.request(
@@ -35,53 +87,57 @@ class GrocyClient:
                 allow_redirects=False,
                 **kwargs
             )
-            logger.debug(f"Grocy response: Status {response.status_code}, Content-Type: {response.headers.get('Content-Type', 'unknown')}")
+            logger.debug("Grocy response: Status %s, Content-Type: %s", response.status_code, response.headers.get('Content-Type', 'unknown'))
 
             # Check for redirects (means auth failed or session issue)
             if response.status_code in (301, 302, 303, 307, 308):
                 if retry:
-                    logger.warning(f"Grocy redirect detected, retrying in 1 second...")
+                    logger.warning("Grocy redirect detected, retrying in 1 second...")
                     time.sleep(1)
                     # Retry without further retries to avoid infinite loop
-                    return self._request(method, endpoint, retry=False, **kwargs)
+                    return self._request(method, endpoint, retry=False, miss_key=miss_key,
+                                         miss_generation=miss_generation, **kwargs)
                 else:
-                    logger.error(f"Grocy returned redirect (status {response.status_code}) - API key may be invalid")
-                    logger.error(f"Redirect location: {response.headers.get('Location', 'unknown')}")
+                    logger.error("Grocy returned redirect (status %s) - API key may be invalid", response.status_code)
+                    logger.error("Redirect location: %s", response.headers.get('Location', 'unknown'))
                     return None
 
             # Handle 400 Bad Request
             if response.status_code == 400:
                 error_text = response.text[:500] if response.text else "No error message"
-                logger.error(f"Grocy returned 400 for endpoint: {endpoint}")
-                logger.error(f"Response: {error_text}")
+                logger.error("Grocy returned 400 for endpoint: %s", endpoint)
+                logger.error("Response: %s", error_text)
+                if miss_key is not None:
+                    self._remember_miss(miss_key, miss_generation)
                 return None
 
             response.raise_for_status()
 
-            if not response.text:
+            # Check the raw bytes; .text would decode the whole body a second time
+            if not response.content:
                 logger.warning("Grocy returned empty response")
                 return {}
 
-            return response.json()
-        except requests.exceptions.JSONDecodeError as e:
-            logger.error(f"Grocy API returned invalid JSON: {e}")
-            logger.error(f"Response text: {response.text[:200]}")  # First 200 chars
+            return fastjson.loads(response.content)
+        except fastjson.JSONDecodeError as e:
+            logger.error("Grocy API returned invalid JSON: %s", e)
+            logger.error("Response text: %s", response.text[:200])  # First 200 chars
             return None
         except requests.exceptions.HTTPError as e:
             # 404 means not found, which is expected for unknown barcodes
             if e.response.status_code == 404:
-                logger.info(f"Grocy returned 404 (not found) for: {endpoint}")
+                logger.info("Grocy returned 404 (not found) for: %s", endpoint)
+                if miss_key is not None:
+                    self._remember_miss(miss_key, miss_generation)
             else:
-                logger.error(f"Grocy API HTTP error: {e}")
+                logger.error("Grocy API HTTP error: %s", e)
             return None
         except requests.exceptions.RequestException as e:
-            logger.error(f"Grocy API request failed: {e}")
+            logger.error("Grocy API request failed: %s", e)
             return None
 
     def test_connection(self) -> bool:
         """Test Grocy connection with retry logic."""
-        import time
-
         # First attempt
         result = self._request('GET', 'system/info')
         if result is not None:
@@ -94,50 +150,106 @@ class GrocyClient:
         result = self._request('GET', 'system/info')
         return result is not None
 
+    def invalidate(self, barcode: Optional[str] = None, product_id: Optional[int] = None):
+        """Drop cached lookups for a barcode and/or product."""
+        with self._cache_lock:
+            if barcode is not None:
+                self._barcode_cache.pop(barcode, None)
+                self._miss_cache.pop(barcode, None)
+                self._generations[barcode] = self._generations.get(barcode, 0) + 1
+            if product_id is not None:
+                self._product_cache.pop(product_id, None)
+
+    def clear_cache(self):
+        """Forget all cached lookups and default IDs."""
+        with self._cache_lock:
+            self._barcode_cache.clear()
+            self._product_cache.clear()
+            self._miss_cache.clear()
+            self._generations.clear()
+            self._clears += 1
+        self._default_location_id = None
+        self._default_quantity_unit_id = None
+
     def find_product_by_barcode(self, barcode: str) -> Optional[Dict[Any, Any]]:
-        """Find product by barcode."""
-        result = self._request('GET', f'stock/products/by-barcode/{barcode}')
+        """Find product by barcode (hits and misses cached for 60 seconds)."""
+        with self._cache_lock:
+            if barcode in self._miss_cache:
+                return None
+            cached = self._barcode_cache.get(barcode)
+            generation = self._generation(barcode)
+        if cached is not None:
+            return cached
+
+        result = self._request('GET', f'stock/products/by-barcode/{barcode}',
+                               miss_key=barcode, miss_generation=generation)
+        if result is not None:
+            with self._cache_lock:
+                if self._generation(barcode) == generation:
+                    self._barcode_cache[barcode] = result
         return result
 
     def add_product(self, product_id: int, amount: float = 1.0) -> bool:
         """Add product to stock."""
-        data = {
-            'amount': amount,
-            'transaction_type': 'purchase'
-        }
-        result = self._request('POST', f'stock/products/{product_id}/add', json=data)
+        if amount == 1.0:
+            body = _ADD_ONE_BODY
+        else:
+            body = fastjson.dumps({'amount': amount, 'transaction_type': 'purchase'})
+        result = self._request('POST', f'stock/products/{product_id}/add', data=body)
         return result is not None
 
     def consume_product(self, product_id: int, amount: float = 1.0) -> bool:
         """Consume product from stock."""
-        data = {
-            'amount': amount,
-            'transaction_type': 'consume'
-        }
-        result = self._request('POST', f'stock/products/{product_id}/consume', json=data)
+        if amount == 1.0:
+            body = _CONSUME_ONE_BODY
+        else:
+            body = fastjson.dumps({'amount': amount, 'transaction_type': 'consume'})
+        result = self._request('POST', f'stock/products/{product_id}/consume', data=body)
         return result is not None
 
     def get_product_info(self, product_id: int) -> Optional[Dict[Any, Any]]:
-        """Get product information."""
-        return self._request('GET', f'objects/products/{product_id}')
+        """Get product information (cached for 5 minutes)."""
+        with self._cache_lock:
+            cached = self._product_cache.get(product_id)
+        if cached is not None:
+            return cached
+
+        result = self._request('GET', f'objects/products/{product_id}')
+        if result is not None:
+            with self._cache_lock:
+                self._product_cache[product_id] = result
+        return result
 
     def get_default_location_id(self) -> int:
-        """Get the first available location ID from Grocy."""
+        """Get the first available location ID from Grocy (fetched once)."""
+        if self._default_location_id is not None:
+            return self._default_location_id
+
         result = self._request('GET', 'objects/locations')
         if result and len(result) > 0:
             location_id = result[0].get('id', 1)
-            logger.debug(f"Using location ID: {location_id}")
+            logger.debug("Using location ID: %s", location_id)
+            self._default_location_id = location_id
             return location_id
-        return 1  # Fallback to 1
+        return 1  # Fallback to 1 (not remembered, retried next time)
 
     def get_default_quantity_unit_id(self) -> int:
-        """Get the first available quantity unit ID from Grocy."""
+        """Get the first available quantity unit ID from Grocy (fetched once)."""
+        if self._default_quantity_unit_id is not None:
+            return self._default_quantity_unit_id
+
         result = self._request('GET', 'objects/quantity_units')
         if result and len(result) > 0:
             qu_id = result[0].get('id', 1)
-            logger.debug(f"Using quantity unit ID: {qu_id}")
+            logger.debug("Using quantity unit ID: %s", qu_id)
+            self._default_quantity_unit_id = qu_id
             return qu_id
-        return 1  # Fallback to 1
+        return 1  # Fallback to 1 (not remembered, retried next time)
+
+    def prewarm(self):
+        """Fetch the default IDs for new products ahead of the first product creation."""
+        self.get_default_location_id()
+        self.get_default_quantity_unit_id()
 
     def create_product(self, name: str, description: str = "") -> Optional[int]:
         """
@@ -160,7 +272,7 @@ class GrocyClient:
         result = self._request('POST', 'objects/products', json=data)
         if result and 'created_object_id' in result:
             product_id = result['created_object_id']
-            logger.info(f"✅ Created product in Grocy: {name} (ID: {product_id})")
+            logger.info("✅ Created product in Grocy: %s (ID: %s)", name, product_id)
             return product_id
         return None
 
@@ -176,6 +288,7 @@ class GrocyClient:
         }
         result = self._request('POST', 'objects/product_barcodes', json=data)
         if result:
-            logger.info(f"✅ Added barcode {barcode} to product {product_id}")
+            self.invalidate(barcode=barcode)
+            logger.info("✅ Added barcode %s to product %s", barcode, product_id)
             return True
         return False
@@ -0,0 +1,19 @@
+"""Gunicorn configuration for Barcode Buddy."""
+
+bind = "0.0.0.0:5000"
+
+# A single worker process: the scanner threads, recent scans and the
+# current mode/quantity live in process memory and must not be duplicated.
+# Threads give concurrent request handling, so a slow Grocy call in one
+# request no longer blocks /api/scans polling. Open /api/scans/stream
+# connections each hold a thread; main.MAX_SCAN_STREAMS keeps that below
+# the thread count.
+workers = 1
+worker_class = "gthread"
+threads = 8
+
+# The UI polls /api/scans; keep its connection open between polls
+keepalive = 30
+
+# Log to stdout/stderr like the application itself
+errorlog = "-"
@@ -0,0 +1,32 @@
+"""HTTP session setup shared by the API clients."""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session(pool_size: int = 4) -> requests.Session:
+    """
+    Create a requests.Session with keep-alive connection pooling.
+
+    Reusing the session keeps TCP/TLS connections open between lookups.
+    GET requests are retried twice on 502/503/504 with a short backoff, and
+    once if the connection can't be established. Read timeouts are not
+    retried, so a hung server costs one timeout, not three. POSTs are never
+    retried, so stock is not booked twice.
+    """
+    retries = Retry(
+        total=2,
+        connect=1,
+        read=False,  # Raise the timeout itself (requests.ReadTimeout)
+        other=0,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        raise_on_status=False  # Return the last response, callers check status
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
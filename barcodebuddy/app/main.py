@@ -1,16 +1,29 @@
 """Main Flask application."""
 from flask import Flask, render_template, jsonify, request, session, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_babel import Babel, gettext
 import logging
 import sys
 import os
+import queue
+import re
+import threading
+import time
+import hashlib
+import gzip
+import io
 import requests
 from config import Config
 from grocy import GrocyClient
 from scanner import ScannerHandler
 from openfoodfacts import OpenFoodFactsClient
 from upcdatabase import UPCDatabaseClient
-from pdf_generator import generate_quantity_barcodes_pdf
+from http_session import create_session
+from pdf_generator import get_quantity_barcodes_pdf
+from scan_log import ScanLog
+import fastjson
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 
 # Setup logging
@@ -21,8 +34,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson (via fastjson)."""
+
+    def dumps(self, obj, **kwargs):
+        return fastjson.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return fastjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response, no str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(fastjson.dumps(obj), mimetype=self.mimetype)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['SECRET_KEY'] = 'barcode-buddy-secret-key'  # For session management
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
@@ -46,24 +74,58 @@ if config.debug:
 # Initialize Babel with locale selector (after config is loaded)
 babel.init_app(app, locale_selector=get_locale)
 
-# Initialize Grocy client
+# Seconds between Grocy connection attempts while it is unreachable
+GROCY_RETRY_INTERVAL = 30
+
+# Grocy client, set once the connection test succeeds
 grocy_client = None
+
+def connect_grocy():
+    """Test the Grocy connection until it succeeds, then enable the client."""
+    global grocy_client
+    client = GrocyClient(config.grocy_url, config.grocy_api_key)
+    while not client.test_connection():
+        logger.warning("⚠️  Grocy connection failed, retrying in %s seconds", GROCY_RETRY_INTERVAL)
+        time.sleep(GROCY_RETRY_INTERVAL)
+    logger.info("✅ Grocy connection successful")
+    # Creating the first unknown product then skips two lookups
+    client.prewarm()
+    grocy_client = client
+
+# Connect in the background, so the web UI and scanner start right away
+# even when Grocy is slow or still starting up
 if config.has_grocy:
-    grocy_client = GrocyClient(config.grocy_url, config.grocy_api_key)
-    if grocy_client.test_connection():
-        logger.info("✅ Grocy connection successful")
-    else:
-        logger.warning("⚠️  Grocy connection failed")
-        grocy_client = None
+    threading.Thread(target=connect_grocy, name='grocy-connect', daemon=True).start()
 else:
     logger.info("ℹ️  No Grocy configuration - running in standalone mode")
 
 # Initialize product database clients
-openfoodfacts_client = OpenFoodFactsClient()
-upcdatabase_client = UPCDatabaseClient()
+# One pooled session for both product databases; the pool keeps
+# connections per host, so both stay warm
+lookup_session = create_session(pool_size=4)
+openfoodfacts_client = OpenFoodFactsClient(lookup_session)
+upcdatabase_client = UPCDatabaseClient(lookup_session)
+
+# Thread pool for querying the external product databases in parallel
+lookup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='lookup')
+
+# Head start for OpenFoodFacts in seconds. UPC Database's free tier is rate
+# limited, so it's only asked when OpenFoodFacts misses or is slower than this.
+UPC_HEDGE_DELAY = 0.5
 
-# Store recent scans
-recent_scans = []
+# Most distinct products /api/scan/batch looks up ahead of the scan worker
+BATCH_PREFETCH_LIMIT = 256
+
+# Runs those look-ups in the background, so the request returns right away
+prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch')
+
+# Store recent scans (newest first, oldest dropped beyond 50)
+recent_scans = deque(maxlen=50)
+
+# Recent scans are also logged to the add-on's persistent storage and
+# restored from there, so a restart doesn't empty the web UI
+scan_log = ScanLog('/data/recent_scans.ndjson', keep=recent_scans.maxlen)
+recent_scans.extendleft(scan_log.load())
 
 # Current quantity for next product scan (reset after each product)
 # Starts at 0, defaults to 1 if no quantity barcode scanned
@@ -72,60 +134,285 @@ current_quantity = 0.0
 # Current mode: 'add' or 'consume'
 current_mode = 'add'
 
+# Guards recent_scans, current_quantity and current_mode, which the scan
+# worker changes while request threads read them
+state_lock = threading.Lock()
+
+# ETag for /api/scans: bumped on every recorded scan, prefixed with the start
+# time so a restart never reuses a tag the browser still has cached
+scans_version = 0
+scans_etag_prefix = format(time.time_ns(), 'x')
+
+# recent_scans as JSON, shared by all polls and streams until the next scan
+scans_json = None
+
+# Notified on every recorded scan; wakes the /api/scans/stream clients
+scans_changed = threading.Condition(state_lock)
+
+# Each open stream holds a server thread, so keep some for regular requests;
+# browsers that don't get a stream fall back to polling /api/scans
+MAX_SCAN_STREAMS = 4
+scan_stream_slots = threading.BoundedSemaphore(MAX_SCAN_STREAMS)
+# Seconds between keep-alive comments. A closed tab is only noticed when a
+# write fails, which under gunicorn is the second write after the close, so
+# its slot is freed within two keep-alives (about 10 s)
+SCAN_STREAM_KEEPALIVE = 5
+
+def scan_timestamp() -> str:
+    """Current local time in ISO format, for scan results."""
+    return datetime.now().isoformat()
+
+def record_scan(scan_result: dict):
+    """Store a scan result for the web UI (newest first, last 50 kept)."""
+    global scans_version, scans_json
+    with state_lock:
+        recent_scans.appendleft(scan_result)
+        scan_log.append(scan_result)
+        scans_version += 1
+        scans_json = None
+        scans_changed.notify_all()
+
+def get_scans_json() -> bytes:
+    """Return recent_scans as JSON, serialized once per change (call with state_lock held)."""
+    global scans_json
+    if scans_json is None:
+        scans_json = fastjson.dumps(list(recent_scans))
+    return scans_json
+
+def lookup_external_product(barcode: str):
+    """
+    Look up a barcode in all enabled external databases concurrently.
+
+    Returns a (product, database_name) tuple, or (None, None) if no database
+    knows the barcode. OpenFoodFacts is preferred over UPC Database.
+    """
+    # Only query databases that are enabled in configuration
+    lookups = []
+    off_started = threading.Event()
+    if config.enable_openfoodfacts:
+        def lookup_openfoodfacts():
+            off_started.set()
+            return openfoodfacts_client.lookup_barcode(barcode)
+        lookups.append(("OpenFoodFacts", lookup_executor.submit(lookup_openfoodfacts)))
+    if config.enable_upcdatabase:
+        if lookups:
+            # A quick OpenFoodFacts hit (or cache hit) makes UPC Database
+            # unnecessary. The head start counts from when the request
+            # actually begins, not from time spent waiting for a pool thread.
+            off_future = lookups[0][1]
+            off_started.wait()
+            wait((off_future,), timeout=UPC_HEDGE_DELAY)
+            if off_future.done() and off_future.exception() is None and off_future.result():
+                return off_future.result(), "OpenFoodFacts"
+        lookups.append(("UPC Database", lookup_executor.submit(upcdatabase_client.lookup_barcode, barcode)))
+
+    # Remaining requests are in flight together, so this waits max(RTT), not sum(RTT).
+    # A failing lookup must not hide the other database's result.
+    for database_name, future in lookups:
+        try:
+            product = future.result()
+        except Exception:
+            logger.exception("%s lookup failed for barcode: %s", database_name, barcode)
+            continue
+        if product:
+            return product, database_name
+    return None, None
+
+class ScanBatcher:
+    """
+    Coalesce consecutive scans of the same barcode into one Grocy booking.
+
+    Scanning a case of identical items fires one scan per item. Scans of the
+    same barcode arriving within `delay` seconds of each other are counted and
+    handed to the callback once as (barcode, count). A batch is flushed at
+    the latest `max_delay` seconds after its first scan.
+    """
+
+    def __init__(self, callback, delay: float = 0.5, max_delay: float = 1.0):
+        self.callback = callback
+        self.delay = delay
+        self.max_delay = max_delay
+        # Reentrant: submit() flushes the previous barcode while holding it
+        self._lock = threading.RLock()
+        self._barcode = None
+        self._count = 0
+        self._first_scan = 0.0
+        self._timer = None
+
+    def submit(self, barcode: str):
+        """Add a scan to the pending batch, flushing a different pending barcode first."""
+        with self._lock:
+            if barcode != self._barcode:
+                self.flush()
+                self._barcode = barcode
+                self._first_scan = time.monotonic()
+            self._count += 1
+
+            # (Re)arm the timer, but never past max_delay after the first scan
+            if self._timer:
+                self._timer.cancel()
+            remaining = self.max_delay - (time.monotonic() - self._first_scan)
+            self._timer = threading.Timer(max(0.0, min(self.delay, remaining)), self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Process the pending batch now (no-op if nothing is pending)."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            barcode, count = self._barcode, self._count
+            self._barcode, self._count = None, 0
+            if barcode is not None:
+                # Usually runs on the timer thread, not the scan worker, so
+                # errors have to be logged here
+                try:
+                    self.callback(barcode, count)
+                except Exception:
+                    logger.exception("Error processing barcode: %s", barcode)
+
+    def _on_timer(self):
+        with self._lock:
+            # Ignore timers that were superseded while waiting for the lock
+            if threading.current_thread() is self._timer:
+                self.flush()
+
 def handle_barcode(barcode: str):
-    """Handle scanned barcode with automatic product creation."""
-    global current_quantity, current_mode
+    """Queue a scanned barcode for the scan worker (never blocks the caller)."""
+    scan_queue.put(barcode)
+
+def scan_worker():
+    """Process queued barcodes one at a time, in scan order."""
+    while True:
+        barcode = scan_queue.get()
+        try:
+            process_barcode(barcode)
+        except Exception:
+            logger.exception("Error processing barcode: %s", barcode)
+
+def set_add_mode(barcode: str, scan_result: dict):
+    """Control barcode: book the following products into stock."""
+    global current_mode
+    with state_lock:
+        current_mode = 'add'
+    scan_result['status'] = 'mode'
+    scan_result['message'] = f"➕ Mode: ADD (adding to stock)"
+    logger.info("➕ Mode switched to: ADD")
+
+def set_consume_mode(barcode: str, scan_result: dict):
+    """Control barcode: consume the following products from stock."""
+    global current_mode
+    with state_lock:
+        current_mode = 'consume'
+    scan_result['status'] = 'mode'
+    scan_result['message'] = f"➖ Mode: CONSUME (removing from stock)"
+    logger.info("➖ Mode switched to: CONSUME")
+
+def add_quantity(barcode: str, scan_result: dict):
+    """Control barcode: add its number to the quantity for the next product."""
+    global current_quantity
+    match = quantity_pattern.fullmatch(barcode)
+    if match:
+        quantity_to_add = float(match.group(1))
+        with state_lock:
+            current_quantity += quantity_to_add
+            quantity = current_quantity
+        scan_result['status'] = 'quantity'
+        scan_result['message'] = f"🔢 Quantity set to: {quantity}"
+        logger.info("🔢 Quantity updated: %s (added %s)", quantity, quantity_to_add)
+    else:
+        scan_result['status'] = 'error'
+        scan_result['message'] = f"❌ Invalid quantity barcode format"
+        logger.error("Invalid quantity barcode: %s", barcode)
+
+# Quantity barcodes carry a plain decimal number; anything else float()
+# would take (nan, inf, 1e3, signs, non-ASCII digits) is rejected
+quantity_pattern = re.compile(re.escape(config.barcode_quantity_prefix) + r'(\d+(?:\.\d+)?)', re.ASCII)
+
+# Control barcodes, resolved with one dict lookup (plus a prefix check for
+# quantities) instead of comparing against each config value per scan
+control_barcodes = {
+    config.barcode_add: set_add_mode,
+    config.barcode_consume: set_consume_mode,
+}
+control_prefixes = (
+    (config.barcode_quantity_prefix, add_quantity),
+)
 
-    logger.info(f"📦 Processing barcode: {barcode}")
+def get_control_handler(barcode: str):
+    """Return the handler for a control barcode, None for product barcodes."""
+    handler = control_barcodes.get(barcode)
+    if handler is None:
+        for prefix, prefix_handler in control_prefixes:
+            if barcode.startswith(prefix):
+                return prefix_handler
+    return handler
+
+def process_barcode(barcode: str):
+    """Handle scanned barcode: control barcodes directly, products batched."""
+    logger.info("📦 Processing barcode: %s", barcode)
+
+    handler = get_control_handler(barcode)
+    if handler is None:
+        if grocy_client:
+            scan_batcher.submit(barcode)
+        else:
+            # Nothing is booked without Grocy, so every scan gets its own history entry
+            process_product_barcode(barcode)
+        return
+
+    # Control barcodes apply to the products scanned after them, so any
+    # pending product batch has to be booked first
+    scan_batcher.flush()
 
     scan_result = {
         'barcode': barcode,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': scan_timestamp(),
+        'status': 'unknown',
+        'message': ''
+    }
+    handler(barcode, scan_result)
+    record_scan(scan_result)
+
+def book_pending(product_id, count: int = 1):
+    """
+    Add or consume a product with the pending quantity and mode.
+
+    Quantity and mode are taken together under state_lock and the quantity
+    is cleared right away, so the scan worker and /api/create-product can't
+    both apply it. If the booking fails, the quantity is put back for the
+    next product. Returns (success, amount, mode).
+    """
+    global current_quantity
+    with state_lock:
+        quantity, mode = current_quantity, current_mode
+        current_quantity = 0.0
+
+    # Default to 1 if no quantity barcode was scanned; the quantity applies
+    # to the first scan, each repeat adds one more
+    amount = (quantity if quantity > 0 else 1.0) + (count - 1)
+    success = False
+    try:
+        if mode == 'add':
+            success = grocy_client.add_product(product_id, amount)
+        else:
+            success = grocy_client.consume_product(product_id, amount)
+    finally:
+        if not success and quantity:
+            with state_lock:
+                # Added, so quantity barcodes scanned meanwhile are kept
+                current_quantity += quantity
+    return success, amount, mode
+
+def process_product_barcode(barcode: str, count: int = 1):
+    """Handle a product barcode scanned `count` times, with automatic product creation."""
+    scan_result = {
+        'barcode': barcode,
+        'timestamp': scan_timestamp(),
         'status': 'unknown',
         'message': ''
     }
-
-    # Check if this is a mode switch barcode
-    if barcode == config.barcode_add:
-        current_mode = 'add'
-        scan_result['status'] = 'mode'
-        scan_result['message'] = f"➕ Mode: ADD (adding to stock)"
-        logger.info(f"➕ Mode switched to: ADD")
-        # Store and return
-        recent_scans.insert(0, scan_result)
-        if len(recent_scans) > 50:
-            recent_scans.pop()
-        return
-    elif barcode == config.barcode_consume:
-        current_mode = 'consume'
-        scan_result['status'] = 'mode'
-        scan_result['message'] = f"➖ Mode: CONSUME (removing from stock)"
-        logger.info(f"➖ Mode switched to: CONSUME")
-        # Store and return
-        recent_scans.insert(0, scan_result)
-        if len(recent_scans) > 50:
-            recent_scans.pop()
-        return
-
-    # Check if this is a quantity barcode
-    if barcode.startswith(config.barcode_quantity_prefix):
-        try:
-            quantity_str = barcode[len(config.barcode_quantity_prefix):]
-            quantity_to_add = float(quantity_str)
-            current_quantity += quantity_to_add
-            scan_result['status'] = 'quantity'
-            scan_result['message'] = f"🔢 Quantity set to: {current_quantity}"
-            logger.info(f"🔢 Quantity updated: {current_quantity} (added {quantity_to_add})")
-        except (IndexError, ValueError) as e:
-            scan_result['status'] = 'error'
-            scan_result['message'] = f"❌ Invalid quantity barcode format"
-            logger.error(f"Invalid quantity barcode: {barcode} - {e}")
-
-        # Store scan result and return
-        recent_scans.insert(0, scan_result)
-        if len(recent_scans) > 50:
-            recent_scans.pop()
-        return
 
     # Regular product barcode handling
     if grocy_client:
@@ -134,7 +421,7 @@ def handle_barcode(barcode: str):
 
         if product:
             # Product exists in Grocy
-            logger.debug(f"Product data from Grocy: {product}")
+            logger.debug("Product data from Grocy: %s", product)
 
             # Grocy API returns nested structure: {'product': {'id': ...}}
             if 'product' in product and isinstance(product['product'], dict):
@@ -148,13 +435,10 @@ def handle_barcode(barcode: str):
                 product_info = None
 
             if not product_id:
-                logger.error(f"No product_id found in response: {product}")
+                logger.error("No product_id found in response: %s", product)
                 scan_result['status'] = 'error'
                 scan_result['message'] = f"❌ Invalid product data from Grocy"
-                # Store and return
-                recent_scans.insert(0, scan_result)
-                if len(recent_scans) > 50:
-                    recent_scans.pop()
+                record_scan(scan_result)
                 return
 
             # If product info wasn't in the barcode response, fetch it separately
@@ -163,16 +447,12 @@ def handle_barcode(barcode: str):
 
             if product_info:
                 product_name = product_info.get('name', 'Unknown')
-                # Use current quantity, or default to 1 if no quantity barcode was scanned
-                amount = current_quantity if current_quantity > 0 else 1.0
-
                 # Add or consume based on current mode
-                if current_mode == 'add':
-                    success = grocy_client.add_product(product_id, amount)
+                success, amount, mode = book_pending(product_id, count)
+                if mode == 'add':
                     action_emoji = "➕"
                     action_text = "Added"
                 else:  # consume mode
-                    success = grocy_client.consume_product(product_id, amount)
                     action_emoji = "➖"
                     action_text = "Removed"
 
@@ -180,8 +460,7 @@ def handle_barcode(barcode: str):
                     quantity_text = f" ({amount}x)" if amount != 1 else ""
                     scan_result['status'] = 'success'
                     scan_result['message'] = f"{action_emoji} {action_text}: {product_name}{quantity_text}"
-                    logger.info(f"{action_emoji} {action_text} product: {product_name} (quantity: {amount})")
-                    current_quantity = 0.0  # Reset after successful operation
+                    logger.info("%s %s product: %s (quantity: %s)", action_emoji, action_text, product_name, amount)
                 else:
                     scan_result['status'] = 'error'
                     scan_result['message'] = f"❌ Failed to {action_text.lower()}: {product_name}"
@@ -190,51 +469,32 @@ def handle_barcode(barcode: str):
                 scan_result['message'] = f"❌ Error reading product info"
         else:
             # Step 2: Product not in Grocy - try external databases
-            logger.info(f"🔍 Product not in Grocy, checking external databases...")
-
-            # Try databases in order: OpenFoodFacts → UPC Database
-            # Only query databases that are enabled in configuration
-            external_product = None
-            database_name = None
+            logger.info("🔍 Product not in Grocy, checking external databases...")
 
-            if config.enable_openfoodfacts and not external_product:
-                external_product = openfoodfacts_client.lookup_barcode(barcode)
-                if external_product:
-                    database_name = "OpenFoodFacts"
-
-            if config.enable_upcdatabase and not external_product:
-                external_product = upcdatabase_client.lookup_barcode(barcode)
-                if external_product:
-                    database_name = "UPC Database"
+            # Query OpenFoodFacts and UPC Database in parallel
+            external_product, database_name = lookup_external_product(barcode)
 
             if external_product:
                 # Step 3: Found in external database - create in Grocy
                 product_name = external_product['name']
                 description = f"{external_product.get('brand', '')} - {external_product.get('quantity', '')}".strip(' -')
 
-                logger.info(f"🆕 Creating new product from {database_name}: {product_name}")
+                logger.info("🆕 Creating new product from %s: %s", database_name, product_name)
                 product_id = grocy_client.create_product(product_name, description)
 
                 if product_id:
                     # Step 4: Add barcode to new product
                     if grocy_client.add_barcode_to_product(product_id, barcode):
                         # Step 5: Add to stock with current quantity (only makes sense in add mode)
-                        amount = current_quantity if current_quantity > 0 else 1.0
-
-                        if current_mode == 'add':
-                            success = grocy_client.add_product(product_id, amount)
-                            action_text = "Added"
-                        else:
-                            # Note: Consuming a just-created product is unusual, but supported
-                            success = grocy_client.consume_product(product_id, amount)
-                            action_text = "Removed"
+                        # Note: Consuming a just-created product is unusual, but supported
+                        success, amount, mode = book_pending(product_id, count)
+                        action_text = "Added" if mode == 'add' else "Removed"
 
                         if success:
                             quantity_text = f" ({amount}x)" if amount != 1 else ""
                             scan_result['status'] = 'success'
                             scan_result['message'] = f"🆕 Created from {database_name} & {action_text}: {product_name}{quantity_text}"
-                            logger.info(f"🆕 Successfully created from {database_name} and {action_text.lower()}: {product_name} (quantity: {amount})")
-                            current_quantity = 0.0  # Reset after successful operation
+                            logger.info("🆕 Successfully created from %s and %s: %s (quantity: %s)", database_name, action_text.lower(), product_name, amount)
                         else:
                             scan_result['status'] = 'warning'
                             scan_result['message'] = f"⚠️ Created {product_name}, but failed to {action_text.lower()}"
@@ -248,32 +508,116 @@ def handle_barcode(barcode: str):
                 # Not found anywhere
                 scan_result['status'] = 'not_found'
                 scan_result['message'] = f"❓ Barcode not found in Grocy, OpenFoodFacts, or UPC Database"
-                logger.warning(f"❓ Barcode {barcode} not found in any database")
+                logger.warning("❓ Barcode %s not found in any database", barcode)
     else:
         scan_result['status'] = 'no_grocy'
         scan_result['message'] = f"📦 Scanned (no Grocy configured)"
 
-    # Store in recent scans (keep last 50)
-    recent_scans.insert(0, scan_result)
-    if len(recent_scans) > 50:
-        recent_scans.pop()
+    if count > 1 and scan_result['status'] != 'success':
+        # Nothing was booked, so say how many scans this entry stands for
+        scan_result['message'] += f" ({count} scans)"
+
+    record_scan(scan_result)
+
+def prefetch_product(barcode: str):
+    """Warm the Grocy and OpenFoodFacts caches for a product barcode."""
+    try:
+        # Runs on the prefetch threads, not lookup_executor, so it never
+        # delays the scan worker's lookups. UPC Database is left to the
+        # worker's hedged lookup, which protects its rate limit.
+        if grocy_client.find_product_by_barcode(barcode) is None and config.enable_openfoodfacts:
+            openfoodfacts_client.lookup_barcode(barcode)
+    except Exception:
+        # Only a warm-up; the scan worker does the real lookup anyway
+        logger.exception("Prefetch failed for barcode: %s", barcode)
+
+# Coalesces repeated scans of the same product into one Grocy call
+scan_batcher = ScanBatcher(process_product_barcode)
+
+# Scanner threads and /api/scan only enqueue; a single worker does the
+# Grocy/database work. One worker on purpose: mode and quantity barcodes
+# change how the following scans are booked, so order must be kept.
+scan_queue = queue.Queue()
+threading.Thread(target=scan_worker, name='scan-worker', daemon=True).start()
 
 # Initialize scanner (auto-detects all available devices)
 scanner = ScannerHandler(None, handle_barcode)
 scanner.start()
 
+# Last rendered main page as (inputs, HTML bytes, gzipped HTML, ETag)
+index_page = None
+
 @app.route('/')
 def index():
-    """Main page."""
-    return render_template('index.html',
-                         has_grocy=config.has_grocy,
-                         scanner_devices=scanner.active_devices,
-                         current_locale=get_locale())
+    """Main page (re-rendered only when its inputs change)."""
+    global index_page
+    # Only the scanner device list changes at runtime
+    key = (config.has_grocy, tuple(scanner.active_devices), get_locale())
+    page = index_page
+    if page is None or page[0] != key:
+        html = render_template('index.html',
+                               has_grocy=config.has_grocy,
+                               scanner_devices=scanner.active_devices,
+                               current_locale=get_locale()).encode('utf-8')
+        page = index_page = (key, html, gzip.compress(html), hashlib.sha1(html).hexdigest())
+
+    if request.accept_encodings['gzip']:
+        # Compressed once per render, not per request
+        response = app.response_class(page[2], mimetype='text/html')
+        response.content_encoding = 'gzip'
+        etag = page[3] + '-gz'
+    else:
+        response = app.response_class(page[1], mimetype='text/html')
+        etag = page[3]
+    response.vary.add('Accept-Encoding')
+    # Let the browser revalidate instead of downloading the page again
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/api/scans')
 def get_scans():
-    """Get recent scans."""
-    return jsonify(recent_scans)
+    """Get recent scans (304 if unchanged since the client's last poll)."""
+    with state_lock:
+        etag = f"{scans_etag_prefix}-{scans_version}"
+        unchanged = request.if_none_match.contains(etag)
+        body = None if unchanged else get_scans_json()
+
+    if unchanged:
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Cacheable, but the browser has to revalidate on every poll
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/scans/stream')
+def stream_scans():
+    """Push the recent scans to the browser whenever they change (server-sent events)."""
+    if not scan_stream_slots.acquire(blocking=False):
+        return jsonify({'success': False, 'error': 'Too many scan streams'}), 503
+
+    def events():
+        sent_version = None
+        while True:
+            with scans_changed:
+                changed = scans_changed.wait_for(lambda: scans_version != sent_version,
+                                                 timeout=SCAN_STREAM_KEEPALIVE)
+                if changed:
+                    sent_version = scans_version
+                    body = get_scans_json()
+            if changed:
+                yield b'data: ' + body + b'\n\n'
+            else:
+                # Writing fails once the client is gone, which ends the stream
+                yield b': keep-alive\n\n'
+
+    response = app.response_class(events(), mimetype='text/event-stream',
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if it never started streaming
+    response.call_on_close(scan_stream_slots.release)
+    return response
 
 @app.route('/api/scan', methods=['POST'])
 def manual_scan():
@@ -287,22 +631,69 @@ def manual_scan():
 
     return jsonify({'success': False, 'error': 'No barcode provided'}), 400
 
+@app.route('/api/scan/batch', methods=['POST'])
+def batch_scan():
+    """Queue a list of barcodes (e.g. an import) in one request, in order."""
+    data = request.get_json(silent=True)
+    barcodes = data.get('barcodes') if isinstance(data, dict) else None
+    if not isinstance(barcodes, list):
+        return jsonify({'success': False, 'error': 'List of barcodes required'}), 400
+
+    barcodes = [b.strip() for b in barcodes if isinstance(b, str) and b.strip()]
+    if not barcodes:
+        return jsonify({'success': False, 'error': 'No barcode provided'}), 400
+
+    if grocy_client:
+        # Look up the distinct products concurrently in the background, so
+        # the scan worker finds most of them cached instead of paying the
+        # round trips one by one. Not waited for, so a large import doesn't
+        # hold a request thread. Capped below the cache sizes, so early
+        # entries aren't evicted before the worker gets to them.
+        products = [b for b in dict.fromkeys(barcodes) if get_control_handler(b) is None]
+        for barcode in products[:BATCH_PREFETCH_LIMIT]:
+            prefetch_executor.submit(prefetch_product, barcode)
+
+    for barcode in barcodes:
+        handle_barcode(barcode)
+    return jsonify({'success': True, 'queued': len(barcodes)})
+
+@app.route('/api/clear-cache', methods=['POST'])
+def clear_cache():
+    """Drop all cached product lookups, e.g. after fixing products in Grocy."""
+    if grocy_client:
+        grocy_client.clear_cache()
+    openfoodfacts_client.clear_cache()
+    upcdatabase_client.clear_cache()
+    logger.info("🧹 Lookup caches cleared")
+    return jsonify({'success': True})
+
+# Last status response as (inputs, JSON bytes, ETag)
+status_page = None
+
 @app.route('/api/status')
 def status():
-    """System status."""
-    return jsonify({
-        'grocy_configured': config.has_grocy,
-        'grocy_connected': grocy_client is not None,
-        'scanner_devices': scanner.active_devices,
-        'scanner_active': scanner.running,
-        'scan_count': len(recent_scans)
-    })
+    """System status (serialized only when it changes, 304 if unchanged)."""
+    global status_page
+    key = (grocy_client is not None, tuple(scanner.active_devices), scanner.running, len(recent_scans))
+    page = status_page
+    if page is None or page[0] != key:
+        body = fastjson.dumps({
+            'grocy_configured': config.has_grocy,
+            'grocy_connected': key[0],
+            'scanner_devices': list(key[1]),
+            'scanner_active': key[2],
+            'scan_count': key[3]
+        })
+        page = status_page = (key, body, hashlib.sha1(body).hexdigest())
+
+    response = app.response_class(page[1], mimetype='application/json')
+    response.set_etag(page[2])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/api/create-product', methods=['POST'])
 def create_product():
     """Create a new product with barcode and add to stock."""
-    global current_quantity, current_mode
-
     data = request.get_json()
     barcode = data.get('barcode', '').strip()
     product_name = data.get('product_name', '').strip()
@@ -321,62 +712,55 @@ def create_product():
 
         # Add barcode to product
         if not grocy_client.add_barcode_to_product(product_id, barcode):
-            logger.warning(f"Product created but failed to add barcode")
+            logger.warning("Product created but failed to add barcode")
 
         # Add to stock based on current mode
-        amount = current_quantity if current_quantity > 0 else 1.0
-
-        if current_mode == 'add':
-            success = grocy_client.add_product(product_id, amount)
-            action_text = "Added"
-        else:  # consume mode
-            success = grocy_client.consume_product(product_id, amount)
-            action_text = "Removed"
+        success, amount, mode = book_pending(product_id)
+        action_text = "Added" if mode == 'add' else "Removed"
 
         if success:
-            # Reset quantity after successful operation
-            current_quantity = 0.0
-
             # Create scan result
             scan_result = {
                 'barcode': barcode,
-                'timestamp': __import__('datetime').datetime.now().isoformat(),
+                'timestamp': scan_timestamp(),
                 'status': 'success',
                 'message': f"✨ Created '{product_name}' and {action_text.lower()} {amount}x to stock"
             }
 
-            # Store in recent scans
-            recent_scans.insert(0, scan_result)
-            if len(recent_scans) > 50:
-                recent_scans.pop()
+            record_scan(scan_result)
 
-            logger.info(f"✨ Created product '{product_name}' (ID: {product_id}) and {action_text.lower()} {amount}x")
+            logger.info("✨ Created product '%s' (ID: %s) and %s %sx", product_name, product_id, action_text.lower(), amount)
 
             return jsonify({'success': True, 'product_id': product_id, 'product_name': product_name})
         else:
             return jsonify({'success': False, 'error': f'Product created but failed to {action_text.lower()} to stock'}), 500
 
     except Exception as e:
-        logger.error(f"Error creating product: {e}")
+        logger.error("Error creating product: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/download-quantity-barcodes')
 def download_quantity_barcodes():
     """View PDF with quantity barcodes in browser."""
     try:
-        pdf_buffer = generate_quantity_barcodes_pdf()
+        # Generated once; each response gets its own reader over the bytes
+        pdf_buffer = io.BytesIO(get_quantity_barcodes_pdf())
         return send_file(
             pdf_buffer,
             mimetype='application/pdf',
-            as_attachment=False
+            as_attachment=False,
+            max_age=3600
         )
     except Exception as e:
-        logger.error(f"Error generating PDF: {e}")
+        logger.error("Error generating PDF: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
-if __name__ == '__main__':
-    logger.info("🚀 Starting Barcode Buddy (Python)")
-    logger.info(f"📱 Scanner: Auto-detecting all available devices")
-    logger.info(f"🔗 Grocy: {'✅ Configured' if config.has_grocy else '❌ Not configured'}")
+# Startup banner at module level, so it is logged under gunicorn as well
+logger.info("🚀 Starting Barcode Buddy (Python)")
+logger.info("📱 Scanner: Auto-detecting all available devices")
+logger.info("🔗 Grocy: %s", '✅ Configured' if config.has_grocy else '❌ Not configured')
 
-    app.run(host='0.0.0.0', port=5000)
+if __name__ == '__main__':
+    # Development only; the add-on runs under gunicorn (see gunicorn.conf.py).
+    # Threaded, so the scan stream doesn't block other requests here either.
+    app.run(host='0.0.0.0', port=5000, threaded=True)
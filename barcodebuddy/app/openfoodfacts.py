@@ -1,6 +1,10 @@
 """OpenFoodFacts API client for barcode lookup."""
 import requests
 import logging
+import threading
+import fastjson
+from http_session import create_session
+from cachetools import TTLCache
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -11,20 +15,58 @@ class OpenFoodFactsClient:
 
     BASE_URL = "https://world.openfoodfacts.org/api/v2"
 
+    # Only request the fields we extract; full product documents include
+    # nutriments, tags and images and can exceed 100KB
+    FIELDS = "product_name,brands,quantity,image_url,categories,ingredients_text"
+
+    def __init__(self, session: Optional[requests.Session] = None):
+        # Keep-alive session, so repeated lookups skip the TLS handshake;
+        # may be shared with the other product database client
+        self.session = session or create_session()
+        # Found products, for scanning a case of identical items
+        self._cache = TTLCache(maxsize=512, ttl=300)
+        # Barcodes OpenFoodFacts doesn't know, so rescans skip the request
+        self._miss_cache = TTLCache(maxsize=2048, ttl=3600)
+        # Lookups run on a thread pool, and TTLCache isn't thread-safe
+        self._cache_lock = threading.Lock()
+
+    def clear_cache(self):
+        """Forget cached products and misses."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._miss_cache.clear()
+
     def lookup_barcode(self, barcode: str) -> Optional[Dict[Any, Any]]:
         """
         Look up a barcode in OpenFoodFacts database.
 
         Returns product info if found, None otherwise.
         """
+        with self._cache_lock:
+            if barcode in self._miss_cache:
+                logger.info("❌ Not found in OpenFoodFacts (cached): %s", barcode)
+                return None
+            cached = self._cache.get(barcode)
+        if cached is not None:
+            logger.info("✅ Found in OpenFoodFacts (cached): %s", cached['name'])
+            return cached
+
         try:
             url = f"{self.BASE_URL}/product/{barcode}.json"
-            logger.info(f"Looking up barcode in OpenFoodFacts: {barcode}")
+            logger.info("Looking up barcode in OpenFoodFacts: %s", barcode)
+
+            response = self.session.get(url, params={'fields': self.FIELDS}, timeout=(3, 10))
+
+            # API v2 answers unknown barcodes with 404
+            if response.status_code == 404:
+                logger.info("❌ Not found in OpenFoodFacts: %s", barcode)
+                with self._cache_lock:
+                    self._miss_cache[barcode] = True
+                return None
 
-            response = requests.get(url, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
+            data = fastjson.loads(response.content)
 
             if data.get('status') == 1 and data.get('product'):
                 product = data['product']
@@ -40,12 +82,19 @@ class OpenFoodFactsClient:
                     'ingredients': product.get('ingredients_text', '')
                 }
 
-                logger.info(f"✅ Found in OpenFoodFacts: {product_info['name']}")
+                logger.info("✅ Found in OpenFoodFacts: %s", product_info['name'])
+                with self._cache_lock:
+                    self._cache[barcode] = product_info
                 return product_info
             else:
-                logger.info(f"❌ Not found in OpenFoodFacts: {barcode}")
+                logger.info("❌ Not found in OpenFoodFacts: %s", barcode)
+                with self._cache_lock:
+                    self._miss_cache[barcode] = True
                 return None
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"OpenFoodFacts API error: {e}")
+            logger.error("OpenFoodFacts API error: %s", e)
+            return None
+        except fastjson.JSONDecodeError as e:
+            logger.error("OpenFoodFacts API returned invalid JSON: %s", e)
             return None
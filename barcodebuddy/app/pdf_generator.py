@@ -1,5 +1,6 @@
 """PDF Generator for Quantity Barcodes."""
 import io
+from functools import lru_cache
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
@@ -125,3 +126,9 @@ def generate_quantity_barcodes_pdf():
     # Return buffer
     buffer.seek(0)
     return buffer
+
+
+@lru_cache(maxsize=1)
+def get_quantity_barcodes_pdf() -> bytes:
+    """Return the quantity barcodes PDF, generated on first use (the sheet is static)."""
+    return generate_quantity_barcodes_pdf().getvalue()
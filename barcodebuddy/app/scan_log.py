@@ -0,0 +1,84 @@
+"""On-disk log of recent scans, so the history survives a restart."""
+import os
+import logging
+from collections import deque
+from typing import List, Optional
+import fastjson
+
+logger = logging.getLogger(__name__)
+
+
+class ScanLog:
+    """
+    Append-only newline-delimited JSON log of scan results.
+
+    Each scan is appended as one line through an O_APPEND file descriptor.
+    The file is rewritten down to the last `keep` scans on load and after
+    every `compact_every` appends, so it stays small.
+    Not thread-safe: callers serialize load() and append().
+    """
+
+    def __init__(self, path: str, keep: int = 50, compact_every: int = 1000):
+        self.path = path
+        self.keep = keep
+        self.compact_every = compact_every
+        # Encoded lines of the last `keep` scans, oldest first
+        self._lines = deque(maxlen=keep)
+        self._fd: Optional[int] = None
+        self._appended = 0
+
+    def load(self) -> List[dict]:
+        """Read the last `keep` scans (oldest first) and open the log for appending."""
+        try:
+            with open(self.path, 'rb') as f:
+                lines = deque(f, maxlen=self.keep)
+        except FileNotFoundError:
+            lines = []
+        except OSError as e:
+            logger.warning("Cannot read scan log %s: %s", self.path, e)
+            lines = []
+
+        scans = []
+        for line in lines:
+            try:
+                scans.append(fastjson.loads(line))
+            except fastjson.JSONDecodeError:
+                # A crash mid-write can leave a torn last line
+                continue
+            self._lines.append(line if line.endswith(b'\n') else line + b'\n')
+
+        self._compact()
+        return scans
+
+    def append(self, scan_result: dict):
+        """Append one scan to the log."""
+        if self._fd is None:
+            return
+        line = fastjson.dumps(scan_result) + b'\n'
+        self._lines.append(line)
+        try:
+            os.write(self._fd, line)
+        except OSError as e:
+            logger.warning("Cannot write scan log %s: %s", self.path, e)
+            return
+
+        self._appended += 1
+        if self._appended >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Replace the log with the kept lines and reopen it for appending."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.writelines(self._lines)
+            os.replace(tmp_path, self.path)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except OSError as e:
+            # e.g. no /data outside the add-on; scans then stay in memory only
+            logger.warning("Scan history will not be persisted (%s): %s", self.path, e)
+            return
+        self._appended = 0
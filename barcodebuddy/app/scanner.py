@@ -1,12 +1,97 @@
 """USB Scanner handler using hidraw - Multi-device support."""
+import fcntl
 import threading
 import logging
 import os
-from typing import Callable, Optional, List
+import selectors
+import socket
+import struct
+from typing import Callable, Dict, Optional, List, Tuple
 import time
 
 logger = logging.getLogger(__name__)
 
+# Netlink protocol for kernel device events (linux/netlink.h); the socket
+# module doesn't export it
+NETLINK_KOBJECT_UEVENT = 15
+
+# struct input_event: timeval (two longs), type, code, value. 24 bytes on
+# 64-bit, 16 on 32-bit (armhf/i386), so the size comes from the format.
+INPUT_EVENT = struct.Struct('llHHI')
+
+# hidraw ioctls (linux/hidraw.h): report descriptor size, and the descriptor
+# itself into a struct of a 32-bit size and up to 4096 bytes
+HIDIOCGRDESCSIZE = 0x80044801
+HIDIOCGRDESC = 0x90044802
+HID_MAX_DESCRIPTOR_SIZE = 4096
+
+
+def _translation_table(key_map: dict) -> Tuple[bytes, bytes]:
+    """Build bytes.translate() arguments from a key code map: the table and the unmapped codes to delete."""
+    table = bytes(ord(key_map.get(code, '\0')) for code in range(256))
+    unmapped = bytes(code for code in range(256) if code not in key_map)
+    return table, unmapped
+
+
+def _device_nodes(directory: str, prefix: str, count: int) -> List[str]:
+    """Existing device nodes prefix0 .. prefix<count-1> in a directory, in number order."""
+    try:
+        names = set(os.listdir(directory))
+    except OSError:
+        return []
+    return [f"{directory}/{prefix}{i}" for i in range(count) if f"{prefix}{i}" in names]
+
+
+def _keyboard_report_id(descriptor: bytes) -> Optional[int]:
+    """
+    Find the keyboard in a HID report descriptor.
+
+    Returns the report ID of the keyboard reports (0 if the device uses no
+    report IDs), or None if the device has no keyboard collection.
+    """
+    usage_page = usage = None
+    report_id = 0
+    keyboard_id = None
+    keyboard_depth = depth = 0
+    i = 0
+    while i < len(descriptor):
+        prefix = descriptor[i]
+        if prefix == 0xFE:  # Long item: size byte, tag byte, data
+            i += 3 + (descriptor[i + 1] if i + 1 < len(descriptor) else 0)
+            continue
+        size = (0, 1, 2, 4)[prefix & 0x03]
+        value = int.from_bytes(descriptor[i + 1:i + 1 + size], 'little')
+        tag = prefix & 0xFC
+        i += 1 + size
+
+        if tag == 0x04:  # Usage Page
+            usage_page = value
+        elif tag == 0x84:  # Report ID
+            report_id = value
+            if keyboard_depth:
+                # The keyboard's reports are the first ones declared in its collection
+                return report_id
+        elif tag == 0x08:  # Usage
+            # A 4-byte usage carries its own usage page in the high 16 bits
+            usage = (value >> 16, value & 0xFFFF) if size == 4 else (None, value)
+        elif tag == 0xA0:  # Collection
+            depth += 1
+            # Application collection, Generic Desktop / Keyboard
+            page, usage_id = usage if usage else (None, None)
+            if page is None:
+                page = usage_page
+            if value == 1 and page == 0x01 and usage_id == 0x06 and not keyboard_depth:
+                keyboard_depth = depth
+                keyboard_id = report_id
+        elif tag == 0xC0:  # End Collection
+            if keyboard_depth == depth:
+                return keyboard_id
+            depth -= 1
+
+        if tag & 0x0C == 0:  # Main items clear the local usage
+            usage = None
+    return keyboard_id
+
 
 class ScannerHandler:
     """Handle multiple USB barcode scanners via hidraw."""
@@ -22,6 +107,30 @@ class ScannerHandler:
         40: '\n',  # Enter
         45: '-', 46: '=', 47: '[', 48: ']',
     }
+    # The same map as a translation table, so a whole HID report is
+    # converted in one C call instead of a dict lookup per key
+    HID_TABLE, HID_UNMAPPED = _translation_table(HID_TO_CHAR)
+
+    # Linux input event key codes to characters (US Keyboard layout)
+    KEY_TO_CHAR = {
+        2: '1', 3: '2', 4: '3', 5: '4', 6: '5', 7: '6', 8: '7', 9: '8', 10: '9', 11: '0',
+        16: 'Q', 17: 'W', 18: 'E', 19: 'R', 20: 'T', 21: 'Y', 22: 'U', 23: 'I', 24: 'O', 25: 'P',
+        30: 'A', 31: 'S', 32: 'D', 33: 'F', 34: 'G', 35: 'H', 36: 'J', 37: 'K', 38: 'L',
+        44: 'Z', 45: 'X', 46: 'C', 47: 'V', 48: 'B', 49: 'N', 50: 'M',
+        12: '-', 13: '=',
+        28: '\n',  # Enter
+    }
+    KEY_TABLE, KEY_UNMAPPED = _translation_table(KEY_TO_CHAR)
+
+    # Seconds between device rescans. With kernel device events a new
+    # scanner is picked up right away and the rescan is only a fallback.
+    POLL_INTERVAL = 5
+    EVENT_RESCAN_INTERVAL = 30
+
+    # Seconds within which the same barcode from the same scanner counts as
+    # one scan. Some scanners fire twice per trigger pull; a person can't
+    # rescan that fast, so real repeat scans still count.
+    DEBOUNCE_INTERVAL = 0.2
 
     def __init__(self, device_path: str, callback: Callable[[str], None]):
         self.device_path = device_path  # Kept for compatibility, but not used
@@ -29,35 +138,57 @@ class ScannerHandler:
         self.running = False
         self.threads: List[threading.Thread] = []
         self.active_devices: List[str] = []
-        self._barcode_buffers = {}  # One buffer per device
+        self._barcode_buffers = {}  # One bytearray per device
+        self._report_ids: Dict[str, int] = {}  # Keyboard report ID per hidraw device, 0 if none
+        self._last_barcodes: Dict[str, Tuple[str, float]] = {}  # Last barcode and its time per device
+        # Notified when a device is plugged in, to wake listeners waiting to reopen theirs
+        self._device_added = threading.Condition()
+        self._device_events = False  # True once the monitor receives kernel device events
+        # Wake pipe: stop() writes to it and every thread waiting in a
+        # selector returns at once. It is never drained, so it stays readable;
+        # start() creates a new one for each run.
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
 
     def start(self):
         """Start listening to all available scanners."""
+        if self._wake_r is not None:
+            # Still readable from the last stop(), which would wake every
+            # selector at once
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+        self._wake_r, self._wake_w = os.pipe()
         self.running = True
 
         # Find all available scanner devices
         devices = self._find_all_devices()
-
         if not devices:
             logger.warning("No scanner devices found, will retry...")
-            # Start a monitoring thread that looks for devices
-            monitor_thread = threading.Thread(target=self._monitor_devices, daemon=True)
-            monitor_thread.start()
-            self.threads.append(monitor_thread)
-        else:
-            # Start a thread for each device
-            for device in devices:
-                thread = threading.Thread(target=self._listen_device, args=(device,), daemon=True)
-                thread.start()
-                self.threads.append(thread)
-                self.active_devices.append(device)
-                logger.info(f"📱 Started scanner thread for: {device}")
-
-        logger.info(f"Scanner handler started (monitoring {len(self.active_devices)} devices)")
+        for device in devices:
+            self._start_listener(device)
+
+        # Keep watching, so scanners plugged in later are picked up too
+        monitor_thread = threading.Thread(target=self._monitor_devices, daemon=True)
+        monitor_thread.start()
+        self.threads.append(monitor_thread)
+
+        logger.info("Scanner handler started (monitoring %s devices)", len(self.active_devices))
+
+    def _start_listener(self, device: str):
+        """Start a listener thread for a device."""
+        thread = threading.Thread(target=self._listen_device, args=(device,), daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        self.active_devices.append(device)
+        logger.info("📱 Started scanner thread for: %s", device)
 
     def stop(self):
         """Stop listening to all scanners."""
         self.running = False
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'x')
+        with self._device_added:
+            self._device_added.notify_all()
         for thread in self.threads:
             thread.join(timeout=2)
         logger.info("Scanner stopped")
@@ -66,55 +197,107 @@ class ScannerHandler:
         """Find all accessible scanner devices."""
         devices = []
 
-        # Try all hidraw devices
-        for i in range(20):  # Check up to 20 hidraw devices
-            hidraw = f"/dev/hidraw{i}"
-            if os.path.exists(hidraw):
+        # Try all hidraw devices (up to 20); one directory listing instead
+        # of checking every possible node
+        for hidraw in _device_nodes('/dev', 'hidraw', 20):
+            try:
+                # Test if we can open it, and that it is a keyboard
+                fd = os.open(hidraw, os.O_RDONLY)
                 try:
-                    # Test if we can open it
-                    with open(hidraw, 'rb') as f:
-                        devices.append(hidraw)
-                        logger.info(f"✅ Found accessible device: {hidraw}")
-                except Exception as e:
-                    logger.debug(f"Cannot access {hidraw}: {e}")
+                    report_id = self._read_keyboard_report_id(fd)
+                finally:
+                    os.close(fd)
+                if report_id is None:
+                    logger.debug("Skipping %s: not a keyboard", hidraw)
                     continue
+                self._report_ids[hidraw] = report_id
+                devices.append(hidraw)
+                logger.debug("✅ Found accessible device: %s", hidraw)
+            except Exception as e:
+                logger.debug("Cannot access %s: %s", hidraw, e)
+                continue
 
         # Fallback: try input event devices if no hidraw found
         if not devices:
-            for i in range(10):
-                event_dev = f"/dev/input/event{i}"
-                if os.path.exists(event_dev):
-                    try:
-                        with open(event_dev, 'rb') as f:
-                            devices.append(event_dev)
-                            logger.info(f"✅ Found accessible device: {event_dev}")
-                    except:
-                        continue
+            for event_dev in _device_nodes('/dev/input', 'event', 10):
+                try:
+                    os.close(os.open(event_dev, os.O_RDONLY))
+                    devices.append(event_dev)
+                    logger.debug("✅ Found accessible device: %s", event_dev)
+                except OSError:
+                    continue
 
         return devices
 
+    def _read_keyboard_report_id(self, fd: int) -> Optional[int]:
+        """Read a hidraw device's report descriptor and find its keyboard report ID (see _keyboard_report_id)."""
+        try:
+            size = struct.unpack('i', fcntl.ioctl(fd, HIDIOCGRDESCSIZE, b'\0' * 4))[0]
+            buffer = bytearray(struct.pack('I', size) + bytes(HID_MAX_DESCRIPTOR_SIZE))
+            fcntl.ioctl(fd, HIDIOCGRDESC, buffer)
+        except OSError as e:
+            # Descriptor unavailable: assume a plain boot keyboard as before
+            logger.debug("Cannot read HID report descriptor: %s", e)
+            return 0
+        return _keyboard_report_id(bytes(buffer[4:4 + size]))
+
+    def _open_uevent_socket(self) -> Optional[socket.socket]:
+        """Subscribe to kernel device events, None if not available."""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            # Port 0: assigned by the kernel; group 1: kernel uevents
+            sock.bind((0, 1))
+            return sock
+        except (AttributeError, OSError) as e:
+            logger.info("Device events unavailable, polling for scanners instead: %s", e)
+            return None
+
+    def _wait_for_device_event(self, sock: socket.socket) -> bool:
+        """Block until a hidraw/input device is added (True) or the rescan interval passes."""
+        with selectors.DefaultSelector() as selector:
+            selector.register(sock, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while self.running:
+                ready = selector.select(self.EVENT_RESCAN_INTERVAL)
+                if not ready or any(key.fd == self._wake_r for key, _ in ready):
+                    return False
+                event = sock.recv(8192)
+                # e.g. b"add@/devices/...\0ACTION=add\0...\0SUBSYSTEM=hidraw\0..."
+                if event.startswith(b'add@') and (b'\0SUBSYSTEM=hidraw\0' in event
+                                                  or b'\0SUBSYSTEM=input\0' in event):
+                    return True
+        return False
+
+    def _wait_for_device_added(self):
+        """Wait before reopening a device; returns early when a device is plugged in."""
+        timeout = self.EVENT_RESCAN_INTERVAL if self._device_events else self.POLL_INTERVAL
+        with self._device_added:
+            self._device_added.wait(timeout)
+
     def _monitor_devices(self):
         """Monitor for new scanner devices and start listening to them."""
-        logger.info("🔍 Device monitor started")
+        sock = self._open_uevent_socket()
+        logger.info("🔍 Device monitor started (%s)", "device events" if sock else "polling")
+        self._device_events = sock is not None
         while self.running:
-            # Check for new devices every 5 seconds
-            time.sleep(5)
-
-            current_devices = self._find_all_devices()
+            if sock:
+                if self._wait_for_device_event(sock):
+                    # A replugged scanner gets the same node back; let its listener retry now
+                    with self._device_added:
+                        self._device_added.notify_all()
+            else:
+                self._wait_for_device_added()
 
             # Start threads for any new devices
-            for device in current_devices:
+            for device in self._find_all_devices():
                 if device not in self.active_devices:
-                    logger.info(f"🆕 New device detected: {device}")
-                    thread = threading.Thread(target=self._listen_device, args=(device,), daemon=True)
-                    thread.start()
-                    self.threads.append(thread)
-                    self.active_devices.append(device)
+                    logger.info("🆕 New device detected: %s", device)
+                    self._start_listener(device)
 
     def _listen_device(self, device: str):
         """Listen to a specific device."""
-        logger.info(f"👂 Listening to: {device}")
-        self._barcode_buffers[device] = ""
+        logger.info("👂 Listening to: %s", device)
+        self._barcode_buffers[device] = bytearray()
 
         while self.running:
             try:
@@ -126,109 +309,122 @@ class ScannerHandler:
                     self._listen_input_event(device)
 
             except PermissionError:
-                logger.error(f"❌ Permission denied: {device}")
+                logger.error("❌ Permission denied: %s", device)
                 break
             except Exception as e:
-                logger.error(f"❌ Error on {device}: {e}")
+                logger.error("❌ Error on %s: %s", device, e)
                 if self.running:
-                    time.sleep(5)
+                    self._wait_for_device_added()
 
         # Remove from active devices when thread exits
         if device in self.active_devices:
             self.active_devices.remove(device)
-        logger.info(f"🛑 Stopped listening to: {device}")
+        logger.info("🛑 Stopped listening to: %s", device)
+
+    def _open_device(self, device: str) -> Tuple[int, selectors.BaseSelector]:
+        """Open a device for non-blocking reads, with a selector waiting on it and the wake pipe."""
+        fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
+        selector = selectors.DefaultSelector()
+        selector.register(fd, selectors.EVENT_READ)
+        selector.register(self._wake_r, selectors.EVENT_READ)
+        return fd, selector
+
+    def _wait_readable(self, selector: selectors.BaseSelector) -> bool:
+        """Wait until the device has data (or is gone); False when stopping."""
+        ready = selector.select()
+        return self.running and not any(key.fd == self._wake_r for key, _ in ready)
 
     def _listen_hidraw(self, device: str):
         """Listen to HID raw device."""
-        with open(device, 'rb') as f:
-            while self.running:
+        report_id = self._report_ids.get(device, 0)
+        fd, selector = self._open_device(device)
+        try:
+            while self._wait_readable(selector):
                 try:
-                    # Read HID report (8 bytes for keyboard)
-                    data = f.read(8)
+                    # hidraw returns exactly one HID report per read
+                    # (8 bytes for keyboard), whatever the buffer size
+                    data = os.read(fd, 64)
+                    if report_id:
+                        # Reports start with their ID; skip the device's
+                        # other reports (e.g. media keys)
+                        if data and data[0] != report_id:
+                            continue
+                        data = data[1:]
                     if len(data) < 8:
                         break
 
-                    # Parse HID keyboard report
-                    modifier = data[0]
-                    keys = data[2:8]
-
-                    # Process each key
-                    for key_code in keys:
-                        if key_code == 0:
-                            continue
-
-                        # Check for Enter (HID code 40)
-                        if key_code == 40:
-                            if self._barcode_buffers[device]:
-                                barcode = self._barcode_buffers[device]
-                                logger.info(f"📦 Barcode from {device}: {barcode}")
-                                self.callback(barcode)
-                                self._barcode_buffers[device] = ""
-                            continue
+                    # Parse HID keyboard report: up to 6 pressed keys from
+                    # byte 2 on; unused slots and unmapped keys are dropped
+                    chars = data[2:8].translate(self.HID_TABLE, self.HID_UNMAPPED)
+                    if not chars:
+                        continue
 
-                        # Map HID code to character
-                        if key_code in self.HID_TO_CHAR:
-                            char = self.HID_TO_CHAR[key_code]
-                            self._barcode_buffers[device] += char
+                    self._handle_chars(device, chars)
 
+                except BlockingIOError:
+                    # Woken without data to read, wait again
+                    continue
                 except Exception as e:
                     if self.running:
-                        logger.debug(f"HID read error on {device}: {e}")
+                        logger.debug("HID read error on %s: %s", device, e)
                     break
+        finally:
+            selector.close()
+            os.close(fd)
 
     def _listen_input_event(self, device: str):
         """Listen to Linux input event device."""
-        import struct
-
-        with open(device, 'rb') as f:
-            event_size = 24
-
-            while self.running:
+        fd, selector = self._open_device(device)
+        try:
+            event_size = INPUT_EVENT.size
+            # Reused for every read; events are parsed in place through a view
+            buffer = bytearray(event_size * 64)
+            view = memoryview(buffer)
+
+            while self._wait_readable(selector):
                 try:
-                    data = f.read(event_size)
-                    if len(data) < event_size:
+                    # evdev returns all pending events in one read (whole
+                    # events only), e.g. the key down/up/sync burst of a scan
+                    size = os.readv(fd, (buffer,))
+                    if size < event_size:
                         break
 
-                    # Parse input event
-                    _, _, ev_type, code, value = struct.unpack('llHHI', data)
+                    # Parse input events, keeping key presses (EV_KEY = 1,
+                    # key down = 1); codes above 255 are buttons, not keys
+                    usable = size - size % event_size
+                    codes = bytes(code for _, _, ev_type, code, value in INPUT_EVENT.iter_unpack(view[:usable])
+                                  if ev_type == 1 and value == 1 and code < 256)
 
-                    # EV_KEY = 1, key down = 1
-                    if ev_type == 1 and value == 1:
-                        self._handle_input_keycode(device, code)
+                    chars = codes.translate(self.KEY_TABLE, self.KEY_UNMAPPED)
+                    if chars:
+                        self._handle_chars(device, chars)
 
+                except BlockingIOError:
+                    # Woken without data to read, wait again
+                    continue
                 except Exception as e:
                     if self.running:
-                        logger.debug(f"Input event read error on {device}: {e}")
+                        logger.debug("Input event read error on %s: %s", device, e)
                     break
-
-    def _handle_input_keycode(self, device: str, code: int):
-        """Handle Linux input event keycode."""
-        # Enter key (code 28)
-        if code == 28:
-            if self._barcode_buffers.get(device):
-                barcode = self._barcode_buffers[device]
-                logger.info(f"📦 Barcode from {device}: {barcode}")
+        finally:
+            selector.close()
+            os.close(fd)
+
+    def _handle_chars(self, device: str, chars: bytes):
+        """Add translated key presses to the device buffer; a newline (Enter) ends a barcode."""
+        buffer = self._barcode_buffers[device]
+        *completed, rest = chars.split(b'\n')
+        for part in completed:
+            buffer += part
+            if buffer:
+                barcode = buffer.decode('ascii')
+                buffer.clear()
+                now = time.monotonic()
+                last = self._last_barcodes.get(device)
+                self._last_barcodes[device] = (barcode, now)
+                if last and last[0] == barcode and now - last[1] < self.DEBOUNCE_INTERVAL:
+                    logger.debug("Ignoring repeated barcode from %s: %s", device, barcode)
+                    continue
+                logger.info("📦 Barcode from %s: %s", device, barcode)
                 self.callback(barcode)
-                self._barcode_buffers[device] = ""
-            return
-
-        # Initialize buffer if needed
-        if device not in self._barcode_buffers:
-            self._barcode_buffers[device] = ""
-
-        # Number keys (codes 2-11)
-        if 2 <= code <= 11:
-            num = str((code - 1) % 10)
-            self._barcode_buffers[device] += num
-            return
-
-        # Letter keys
-        letter_map = {
-            16: 'Q', 17: 'W', 18: 'E', 19: 'R', 20: 'T', 21: 'Y', 22: 'U', 23: 'I', 24: 'O', 25: 'P',
-            30: 'A', 31: 'S', 32: 'D', 33: 'F', 34: 'G', 35: 'H', 36: 'J', 37: 'K', 38: 'L',
-            44: 'Z', 45: 'X', 46: 'C', 47: 'V', 48: 'B', 49: 'N', 50: 'M',
-            12: '-', 13: '=',
-        }
-
-        if code in letter_map:
-            self._barcode_buffers[device] += letter_map[code]
+        buffer += rest
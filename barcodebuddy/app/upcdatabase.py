@@ -1,6 +1,10 @@
 """UPC Database API client for barcode lookup."""
 import requests
 import logging
+import threading
+import fastjson
+from http_session import create_session
+from cachetools import TTLCache
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -11,6 +15,23 @@ class UPCDatabaseClient:
 
     BASE_URL = "https://api.upcdatabase.org/product"
 
+    def __init__(self, session: Optional[requests.Session] = None):
+        # Keep-alive session, so repeated lookups skip the TLS handshake;
+        # may be shared with the other product database client
+        self.session = session or create_session()
+        # Found products, for scanning a case of identical items
+        self._cache = TTLCache(maxsize=512, ttl=300)
+        # Barcodes UPC Database doesn't know; also spares the daily rate limit
+        self._miss_cache = TTLCache(maxsize=2048, ttl=3600)
+        # Lookups run on a thread pool, and TTLCache isn't thread-safe
+        self._cache_lock = threading.Lock()
+
+    def clear_cache(self):
+        """Forget cached products and misses."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._miss_cache.clear()
+
     def lookup_barcode(self, barcode: str) -> Optional[Dict[Any, Any]]:
         """
         Look up a barcode in UPC Database.
@@ -18,19 +39,30 @@ class UPCDatabaseClient:
         Returns product info if found, None otherwise.
         Note: Free tier has rate limits (~100 requests/day)
         """
+        with self._cache_lock:
+            if barcode in self._miss_cache:
+                logger.info("❌ Not found in UPC Database (cached): %s", barcode)
+                return None
+            cached = self._cache.get(barcode)
+        if cached is not None:
+            logger.info("✅ Found in UPC Database (cached): %s", cached['name'])
+            return cached
+
         try:
             url = f"{self.BASE_URL}/{barcode}"
-            logger.info(f"Looking up barcode in UPC Database: {barcode}")
+            logger.info("Looking up barcode in UPC Database: %s", barcode)
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=(3, 10))
 
             # UPC Database returns 404 if not found
             if response.status_code == 404:
-                logger.info(f"❌ Not found in UPC Database: {barcode}")
+                logger.info("❌ Not found in UPC Database: %s", barcode)
+                with self._cache_lock:
+                    self._miss_cache[barcode] = True
                 return None
 
             response.raise_for_status()
-            data = response.json()
+            data = fastjson.loads(response.content)
 
             if data.get('success'):
                 # Extract relevant information
@@ -44,12 +76,19 @@ class UPCDatabaseClient:
                     'description': data.get('description', '')
                 }
 
-                logger.info(f"✅ Found in UPC Database: {product_info['name']}")
+                logger.info("✅ Found in UPC Database: %s", product_info['name'])
+                with self._cache_lock:
+                    self._cache[barcode] = product_info
                 return product_info
             else:
-                logger.info(f"❌ Not found in UPC Database: {barcode}")
+                logger.info("❌ Not found in UPC Database: %s", barcode)
+                with self._cache_lock:
+                    self._miss_cache[barcode] = True
                 return None
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"UPC Database API error: {e}")
+            logger.error("UPC Database API error: %s", e)
+            return None
+        except fastjson.JSONDecodeError as e:
+            logger.error("UPC Database API returned invalid JSON: %s", e)
             return None
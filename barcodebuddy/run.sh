@@ -66,13 +66,13 @@ else
 fi
 
 echo ""
-echo "▶️  Starting Flask application with input group..."
+echo "▶️  Starting Barcode Buddy (gunicorn) with input group..."
 echo ""
 
-# Start Flask app with input group permissions
+# Start the app under gunicorn with input group permissions
 cd /app
 if command -v sg >/dev/null 2>&1; then
-    exec sg input -c "python3 -u main.py"
+    exec sg input -c "gunicorn --config gunicorn.conf.py main:app"
 else
-    exec python3 -u main.py
+    exec gunicorn --config gunicorn.conf.py main:app
 fi